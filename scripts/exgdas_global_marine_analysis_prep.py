@@ -4,7 +4,9 @@
 
 # import os to add ush to path
 import os
-import glob
+import fnmatch
+import re
+from concurrent.futures import ThreadPoolExecutor
 import dateutil.parser as dparser
 import f90nml
 from soca import bkg_utils
@@ -14,15 +16,35 @@ from wxflow import (Logger, Template, TemplateConstants, YAMLFile, FileHandler)
 
 logger = Logger()
 
+# snapshot of the required runtime environment, fail before any staging if incomplete
+required_env = ['HOMEgfs', 'DATA', 'SOCA_INPUT_FIX_DIR', 'RUN', 'GDUMP', 'PDY', 'cyc', 'gcyc', 'assim_freq',
+                'COM_OBS', 'COM_OCEAN_HISTORY_PREV', 'COM_ICE_HISTORY_PREV', 'COM_ICE_RESTART_PREV',
+                'DOMAIN_STACK_SIZE']
+missing_env = [key for key in required_env if key not in os.environ]
+if missing_env:
+    raise KeyError(f"Missing required environment variable(s): {', '.join(missing_env)}")
+env = {key: os.environ[key] for key in required_env}
+
 # get absolute path of ush/ directory either from env or relative to this file
 my_dir = os.path.dirname(__file__)
 my_home = os.path.dirname(os.path.dirname(my_dir))
-gdas_home = os.path.join(os.getenv('HOMEgfs'), 'sorc', 'gdas.cd')
+gdas_home = os.path.join(env['HOMEgfs'], 'sorc', 'gdas.cd')
+
+# fixed parm directories
+parm_dir = os.path.join(gdas_home, 'parm')
+templates_dir = os.path.join(parm_dir, 'templates')
+soca_parm_dir = os.path.join(parm_dir, 'soca')
+berror_yaml_dir = os.path.join(soca_parm_dir, 'berror')
+variational_yaml_dir = os.path.join(soca_parm_dir, 'variational')
 
 # import UFSDA utilities
 import ufsda
 from ufsda.stage import soca_fix
 
+# file name patterns of the static B, compiled once
+visible_re = re.compile(fnmatch.translate('[!.]*'))
+ocean_member_re = re.compile(fnmatch.translate('ocean.*.nc'))
+
 
 def nearest_date(strings, input_date):
     closest_str = ""
@@ -38,12 +60,23 @@ def nearest_date(strings, input_date):
     return closest_str
 
 
+def scandir_match(path, pattern_re):
+    """
+    List the entries of path with a name matching the compiled pattern,
+    empty if path is not a directory (same as glob)
+    """
+    if not os.path.isdir(path):
+        return []
+    with os.scandir(path) as entries:
+        return sorted(entry.path for entry in entries if pattern_re.match(entry.name))
+
+
 def find_bkgerr(input_date, domain):
     """
     Find the std. dev. files that are the closest to the DA window
     """
-    bkgerror_dir = os.path.join(os.getenv('SOCA_INPUT_FIX_DIR'), 'bkgerr', 'stddev')
-    files = glob.glob(os.path.join(bkgerror_dir, domain+'.ensstddev.fc.*.nc'))
+    bkgerror_dir = os.path.join(env['SOCA_INPUT_FIX_DIR'], 'bkgerr', 'stddev')
+    files = scandir_match(bkgerror_dir, re.compile(fnmatch.translate(domain+'.ensstddev.fc.*.nc')))
 
     return nearest_date(files, input_date)
 
@@ -52,20 +85,114 @@ def find_clim_ens(input_date):
     """
     Find the clim. ens. that is the closest to the DA window
     """
-    ens_clim_dir = os.path.join(os.getenv('SOCA_INPUT_FIX_DIR'), 'bkgerr', 'ens')
-    dirs = glob.glob(os.path.join(ens_clim_dir, '*'))
+    ens_clim_dir = os.path.join(env['SOCA_INPUT_FIX_DIR'], 'bkgerr', 'ens')
+    dirs = scandir_match(ens_clim_dir, visible_re)
 
     return nearest_date(dirs, input_date)
 
 
+def render_berror_yaml(berror_yaml):
+    """
+    Substitute the runtime config in a B yaml template and save it in the run directory
+    """
+    logger.info("---------------- generate %s", berror_yaml)
+    config = YAMLFile(path=os.path.join(berror_yaml_dir, berror_yaml))
+    config = Template.substitute_structure(config, TemplateConstants.DOUBLE_CURLY_BRACES, envconfig.get)
+    config.save(os.path.join(anl_dir, berror_yaml))
+
+    return config
+
+
+def stage_obs(obs_files):
+    """
+    Copy the observations from COM_OBS to DATA/obs
+    """
+    logger.info("---------------- Stage observations")
+
+    # list COM_OBS once rather than probing each observation file,
+    # dangling links and directories are skipped as before
+    available_obs = set()
+    if os.path.isdir(env['COM_OBS']):
+        with os.scandir(env['COM_OBS']) as entries:
+            available_obs = {entry.name for entry in entries if entry.is_file()}
+
+    obs_list = []
+    for obs_file in obs_files:
+        obs_src = os.path.join(env['COM_OBS'], obs_file)
+        obs_dst = os.path.join(os.path.realpath(obs_in), obs_file)
+        if obs_file in available_obs:
+            logger.debug("******* fetching %s", obs_src)
+            obs_list.append([obs_src, obs_dst])
+        else:
+            logger.debug("******* %s is not in the database", obs_src)
+    logger.info("******* fetching %d of %d observation files from %s", len(obs_list), len(obs_files), env['COM_OBS'])
+
+    # fetch the observations concurrently, every copy has its own destination
+    failed = []
+    nproc = min(int(os.getenv('OBS_NPROC', 16)), max(len(obs_list), 1))
+    with ThreadPoolExecutor(max_workers=nproc) as executor:
+        futures = {executor.submit(FileHandler({'copy': [obs]}).sync): obs[0] for obs in obs_list}
+    for future, obs_src in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            logger.error("******* failed to fetch %s: %s", obs_src, e)
+            failed.append(obs_src)
+    if failed:
+        raise RuntimeError(f"Failed to fetch {len(failed)} observation file(s): {failed}")
+
+
+def stage_ens():
+    """
+    Stage the ensemble members and return the ensemble size
+    """
+    if dohybvar:
+        logger.info("---------------- Stage ensemble members")
+        ens_member_list = []
+        for mem in range(1, nmem_ens+1):
+            for domain in ['ocean', 'ice']:
+                # TODO(Guillaume): make use and define ensemble COM in the j-job
+                ensroot = env['COM_OCEAN_HISTORY_PREV']
+                ensdir = os.path.join(ensroot, '..', '..', '..', '..', '..',
+                                      f'enkf{RUN}.{PDY}', f'{gcyc}', f'mem{str(mem).zfill(3)}',
+                                      'model_data', domain, 'history')
+                ensdir_real = os.path.realpath(ensdir)
+                f009 = f'enkfgdas.{domain}.t{gcyc}z.inst.f009.nc'
+
+                fname_in = os.path.abspath(os.path.join(ensdir_real, f009))
+                fname_out = os.path.realpath(os.path.join(static_ens, domain+"."+str(mem)+".nc"))
+                ens_member_list.append([fname_in, fname_out])
+        FileHandler({'copy': ens_member_list}).sync()
+
+        # reformat the cice history output
+        for mem in range(1, nmem_ens+1):
+            cice_fname = os.path.realpath(os.path.join(static_ens, "ice."+str(mem)+".nc"))
+            bkg_utils.cice_hist2fms(cice_fname, cice_fname)
+
+        return nmem_ens
+
+    logger.info("---------------- Stage offline ensemble members")
+    ens_member_list = []
+    clim_ens_dir = find_clim_ens(pytz.utc.localize(window_begin, is_dst=None))
+    nmem_clim_ens = len(scandir_match(clim_ens_dir, ocean_member_re))
+    for domain in ['ocean', 'ice']:
+        for mem in range(1, nmem_clim_ens+1):
+            fname = domain+"."+str(mem)+".nc"
+            fname_in = os.path.join(clim_ens_dir, fname)
+            fname_out = os.path.join(static_ens, fname)
+            ens_member_list.append([fname_in, fname_out])
+    FileHandler({'copy': ens_member_list}).sync()
+
+    return nmem_clim_ens
+
+
 ################################################################################
 # runtime environment variables, create directories
 
-logger.info(f"---------------- Setup runtime environement")
+logger.info("---------------- Setup runtime environement")
 
-comin_obs = os.getenv('COMIN_OBS')
-anl_dir = os.getenv('DATA')
-staticsoca_dir = os.getenv('SOCA_INPUT_FIX_DIR')
+anl_dir = env['DATA']
+staticsoca_dir = env['SOCA_INPUT_FIX_DIR']
 if os.getenv('DOHYBVAR') == "YES":
     dohybvar = True
     nmem_ens = int(os.getenv('NMEM_ENS'))
@@ -81,28 +208,26 @@ static_ens = os.path.join(anl_dir, 'static_ens')  # clim. ens.
 FileHandler({'mkdir': [anl_dir, diags, obs_in, bkg_dir, anl_out, static_ens]}).sync()
 
 # Variables of convenience
-half_assim_freq = timedelta(hours=int(os.getenv('assim_freq'))/2)
-window_middle = datetime.strptime(os.getenv('PDY')+os.getenv('cyc'), '%Y%m%d%H')
-window_begin = datetime.strptime(os.getenv('PDY')+os.getenv('cyc'), '%Y%m%d%H') - half_assim_freq
+half_assim_freq = timedelta(hours=int(env['assim_freq'])/2)
+window_middle = datetime.strptime(env['PDY']+env['cyc'], '%Y%m%d%H')
+window_begin = window_middle - half_assim_freq
 window_begin_iso = window_begin.strftime('%Y-%m-%dT%H:%M:%SZ')
 window_middle_iso = window_middle.strftime('%Y-%m-%dT%H:%M:%SZ')
-fcst_begin = datetime.strptime(os.getenv('PDY')+os.getenv('cyc'), '%Y%m%d%H')
-RUN = os.getenv('RUN')
-cyc = os.getenv('cyc')
-gcyc = os.getenv('gcyc')
-PDY = os.getenv('PDY')
+fcst_begin = window_middle
+RUN = env['RUN']
+cyc = env['cyc']
+gcyc = env['gcyc']
+PDY = env['PDY']
 
 ################################################################################
-# fetch observations
-
-logger.info(f"---------------- Stage observations")
+# staging configuration
 
 # create config dict from runtime env
-envconfig = {'window_begin': f"{window_begin.strftime('%Y-%m-%dT%H:%M:%SZ')}",
+envconfig = {'window_begin': window_begin_iso,
              'ATM_WINDOW_BEGIN': window_begin_iso,
              'ATM_WINDOW_MIDDLE': window_middle_iso,
-             'ATM_WINDOW_LENGTH': f"PT{os.getenv('assim_freq')}H"}
-stage_cfg = YAMLFile(path=os.path.join(gdas_home, 'parm', 'templates', 'stage.yaml'))
+             'ATM_WINDOW_LENGTH': f"PT{env['assim_freq']}H"}
+stage_cfg = YAMLFile(path=os.path.join(templates_dir, 'stage.yaml'))
 stage_cfg = Template.substitute_structure(stage_cfg, TemplateConstants.DOUBLE_CURLY_BRACES, envconfig.get)
 stage_cfg = Template.substitute_structure(stage_cfg, TemplateConstants.DOLLAR_PARENTHESES, envconfig.get)
 
@@ -110,145 +235,57 @@ stage_cfg = Template.substitute_structure(stage_cfg, TemplateConstants.DOLLAR_PA
 obs_files = []
 for ob in stage_cfg['observations']['observers']:
     obs_files.append(f"{RUN}.t{cyc}z.{ob['obs space']['name'].lower()}.{PDY}{cyc}.nc4")
-obs_list = []
-
-# copy obs from COM_OBS to DATA/obs
-for obs_file in obs_files:
-    logger.info(f"******* {obs_file}")
-    obs_src = os.path.join(os.getenv('COM_OBS'), obs_file)
-    obs_dst = os.path.join(os.path.realpath(obs_in), obs_file)
-    logger.info(f"******* {obs_src}")
-    if os.path.exists(obs_src):
-        logger.info(f"******* fetching {obs_file}")
-        obs_list.append([obs_src, obs_dst])
-    else:
-        logger.info(f"******* {obs_file} is not in the database")
-
-FileHandler({'copy': obs_list}).sync()
-
-################################################################################
-# stage static files
-
-logger.info(f"---------------- Stage static files")
-ufsda.stage.soca_fix(stage_cfg)
-
 
 ################################################################################
-# stage ensemble members
-if dohybvar:
-    logger.info("---------------- Stage ensemble members")
-    nmem_ens = int(os.getenv('NMEM_ENS'))
-    ens_member_list = []
-    for mem in range(1, nmem_ens+1):
-        for domain in ['ocean', 'ice']:
-            # TODO(Guillaume): make use and define ensemble COM in the j-job
-            ensroot = os.getenv('COM_OCEAN_HISTORY_PREV')
-            ensdir = os.path.join(os.getenv('COM_OCEAN_HISTORY_PREV'), '..', '..', '..', '..', '..',
-                                  f'enkf{RUN}.{PDY}', f'{gcyc}', f'mem{str(mem).zfill(3)}',
-                                  'model_data', domain, 'history')
-            ensdir_real = os.path.realpath(ensdir)
-            f009 = f'enkfgdas.{domain}.t{gcyc}z.inst.f009.nc'
-
-            fname_in = os.path.abspath(os.path.join(ensdir_real, f009))
-            fname_out = os.path.realpath(os.path.join(static_ens, domain+"."+str(mem)+".nc"))
-            ens_member_list.append([fname_in, fname_out])
-    FileHandler({'copy': ens_member_list}).sync()
-
-    # reformat the cice history output
-    for mem in range(1, nmem_ens+1):
-        cice_fname = os.path.realpath(os.path.join(static_ens, "ice."+str(mem)+".nc"))
-        bkg_utils.cice_hist2fms(cice_fname, cice_fname)
-else:
-    logger.info("---------------- Stage offline ensemble members")
-    ens_member_list = []
-    clim_ens_dir = find_clim_ens(pytz.utc.localize(window_begin, is_dst=None))
-    nmem_ens = len(glob.glob(os.path.join(clim_ens_dir, 'ocean.*.nc')))
-    for domain in ['ocean', 'ice']:
-        for mem in range(1, nmem_ens+1):
-            fname = domain+"."+str(mem)+".nc"
-            fname_in = os.path.join(clim_ens_dir, fname)
-            fname_out = os.path.join(static_ens, fname)
-            ens_member_list.append([fname_in, fname_out])
-    FileHandler({'copy': ens_member_list}).sync()
+# stage observations, static files and ensemble members
+# these are independent fetches from different sources, run them concurrently
+
+logger.info("---------------- Stage observations, static files and ensemble members")
+with ThreadPoolExecutor(max_workers=3) as executor:
+    obs_future = executor.submit(stage_obs, obs_files)
+    fix_future = executor.submit(ufsda.stage.soca_fix, stage_cfg)
+    ens_future = executor.submit(stage_ens)
+obs_future.result()
+fix_future.result()
+nmem_ens = ens_future.result()
 os.environ['ENS_SIZE'] = str(nmem_ens)
 
 ################################################################################
 # prepare JEDI yamls
 
-logger.info(f"---------------- Generate JEDI yaml files")
+logger.info("---------------- Generate JEDI yaml files")
 
 ################################################################################
-# copy yaml for grid generation
-
-logger.info(f"---------------- generate gridgen.yaml")
-gridgen_yaml_src = os.path.realpath(os.path.join(gdas_home, 'parm', 'soca', 'gridgen', 'gridgen.yaml'))
-gridgen_yaml_dst = os.path.realpath(os.path.join(stage_cfg['stage_dir'], 'gridgen.yaml'))
-FileHandler({'copy': [[gridgen_yaml_src, gridgen_yaml_dst]]}).sync()
+# copy yamls for grid generation and for the localization/correlation length scales
 
-################################################################################
-# generate the YAML file for the post processing of the clim. ens. B
-berror_yaml_dir = os.path.join(gdas_home, 'parm', 'soca', 'berror')
-
-logger.info(f"---------------- generate soca_ensb.yaml")
-berr_yaml = os.path.join(anl_dir, 'soca_ensb.yaml')
-berr_yaml_template = os.path.join(berror_yaml_dir, 'soca_ensb.yaml')
-config = YAMLFile(path=berr_yaml_template)
-config = Template.substitute_structure(config, TemplateConstants.DOUBLE_CURLY_BRACES, envconfig.get)
-config.save(berr_yaml)
-
-logger.info(f"---------------- generate soca_ensweights.yaml")
-berr_yaml = os.path.join(anl_dir, 'soca_ensweights.yaml')
-berr_yaml_template = os.path.join(berror_yaml_dir, 'soca_ensweights.yaml')
-config = YAMLFile(path=berr_yaml_template)
-config = Template.substitute_structure(config, TemplateConstants.DOUBLE_CURLY_BRACES, envconfig.get)
-config.save(berr_yaml)
+logger.info("---------------- copy gridgen.yaml, soca_setlocscales.yaml and soca_setcorscales.yaml")
+copy_yamls = [[os.path.join(soca_parm_dir, 'gridgen', 'gridgen.yaml'), 'gridgen.yaml'],
+              [os.path.join(berror_yaml_dir, 'soca_setlocscales.yaml'), 'soca_setlocscales.yaml'],
+              [os.path.join(berror_yaml_dir, 'soca_setcorscales.yaml'), 'soca_setcorscales.yaml']]
+FileHandler({'copy': [[os.path.realpath(src), os.path.realpath(os.path.join(stage_cfg['stage_dir'], dst))]
+                      for src, dst in copy_yamls]}).sync()
 
 ################################################################################
-# copy yaml for localization length scales
-
-logger.info(f"---------------- generate soca_setlocscales.yaml")
-locscales_yaml_src = os.path.join(gdas_home, 'parm', 'soca', 'berror', 'soca_setlocscales.yaml')
-locscales_yaml_dst = os.path.join(stage_cfg['stage_dir'], 'soca_setlocscales.yaml')
-FileHandler({'copy': [[locscales_yaml_src, locscales_yaml_dst]]}).sync()
-
-################################################################################
-# copy yaml for correlation length scales
-
-logger.info(f"---------------- generate soca_setcorscales.yaml")
-corscales_yaml_src = os.path.join(gdas_home, 'parm', 'soca', 'berror', 'soca_setcorscales.yaml')
-corscales_yaml_dst = os.path.join(stage_cfg['stage_dir'], 'soca_setcorscales.yaml')
-FileHandler({'copy': [[corscales_yaml_src, corscales_yaml_dst]]}).sync()
-
-################################################################################
-# copy yaml for diffusion initialization
-
-logger.info(f"---------------- generate soca_parameters_diffusion_hz.yaml")
-diffu_hz_yaml = os.path.join(anl_dir, 'soca_parameters_diffusion_hz.yaml')
-diffu_hz_yaml_dir = os.path.join(gdas_home, 'parm', 'soca', 'berror')
-diffu_hz_yaml_template = os.path.join(berror_yaml_dir, 'soca_parameters_diffusion_hz.yaml')
-config = YAMLFile(path=diffu_hz_yaml_template)
-config = Template.substitute_structure(config, TemplateConstants.DOUBLE_CURLY_BRACES, envconfig.get)
-config.save(diffu_hz_yaml)
-
-logger.info(f"---------------- generate soca_parameters_diffusion_vt.yaml")
-diffu_vt_yaml = os.path.join(anl_dir, 'soca_parameters_diffusion_vt.yaml')
-diffu_vt_yaml_dir = os.path.join(gdas_home, 'parm', 'soca', 'berror')
-diffu_vt_yaml_template = os.path.join(berror_yaml_dir, 'soca_parameters_diffusion_vt.yaml')
-config = YAMLFile(path=diffu_vt_yaml_template)
-config = Template.substitute_structure(config, TemplateConstants.DOUBLE_CURLY_BRACES, envconfig.get)
-config.save(diffu_vt_yaml)
+# generate the YAML files for the post processing of the clim. ens. B
+# and for the diffusion initialization
+
+berror_yamls = ['soca_ensb.yaml',
+                'soca_ensweights.yaml',
+                'soca_parameters_diffusion_hz.yaml',
+                'soca_parameters_diffusion_vt.yaml']
+with ThreadPoolExecutor(max_workers=len(berror_yamls)) as executor:
+    berror_configs = list(executor.map(render_berror_yaml, berror_yamls))
+# the var yaml is substituted with the vertical diffusion config, select it by name
+# so that the order of berror_yamls does not matter
+config = berror_configs[berror_yamls.index('soca_parameters_diffusion_vt.yaml')]
 
 ################################################################################
 # generate yaml for soca_var
 
-logger.info(f"---------------- generate var.yaml")
+logger.info("---------------- generate var.yaml")
 var_yaml = os.path.join(anl_dir, 'var.yaml')
-var_yaml_template = os.path.join(gdas_home,
-                                 'parm',
-                                 'soca',
-                                 'variational',
-                                 '3dvarfgat.yaml')
-bkg_utils.gen_bkg_list(bkg_path=os.getenv('COM_OCEAN_HISTORY_PREV'),
+var_yaml_template = os.path.join(variational_yaml_dir, '3dvarfgat.yaml')
+bkg_utils.gen_bkg_list(bkg_path=env['COM_OCEAN_HISTORY_PREV'],
                        out_path=bkg_dir,
                        window_begin=window_begin,
                        yaml_name='bkg_list.yaml')
@@ -257,13 +294,13 @@ os.environ['BKG_LIST'] = 'bkg_list.yaml'
 # select the SABER BLOCKS to use
 if 'SABER_BLOCKS_YAML' in os.environ and os.environ['SABER_BLOCKS_YAML']:
     saber_blocks_yaml = os.getenv('SABER_BLOCKS_YAML')
-    logger.info(f"using non-default SABER blocks yaml: {saber_blocks_yaml}")
+    logger.info("using non-default SABER blocks yaml: %s", saber_blocks_yaml)
 else:
-    logger.info(f"using default SABER blocks yaml")
-    os.environ['SABER_BLOCKS_YAML'] = os.path.join(gdas_home, 'parm', 'soca', 'berror', 'saber_blocks.yaml')
+    logger.info("using default SABER blocks yaml")
+    os.environ['SABER_BLOCKS_YAML'] = os.path.join(berror_yaml_dir, 'saber_blocks.yaml')
 
 # substitute templated variables in the var config
-logger.info(f"{config}")
+logger.info("%s", config)
 varconfig = YAMLFile(path=var_yaml_template)
 varconfig = Template.substitute_structure(varconfig, TemplateConstants.DOUBLE_CURLY_BRACES, config.get)
 varconfig = Template.substitute_structure(varconfig, TemplateConstants.DOLLAR_PARENTHESES, config.get)
@@ -277,15 +314,14 @@ ufsda.yamltools.save_check(varconfig.as_dict(), target=var_yaml, app='var')
 # Prepare the yamls for the "checkpoint" jjob
 # prepare yaml and CICE restart for soca to cice change of variable
 
-logger.info(f"---------------- generate soca to cice yamls")
+logger.info("---------------- generate soca to cice yamls")
 # make a copy of the CICE6 restart
 rst_date = fcst_begin.strftime('%Y%m%d.%H%M%S')
-ice_rst = os.path.join(os.getenv('COM_ICE_RESTART_PREV'), f'{rst_date}.cice_model.res.nc')
+ice_rst = os.path.join(env['COM_ICE_RESTART_PREV'], f'{rst_date}.cice_model.res.nc')
 ice_rst_ana = os.path.join(anl_out, rst_date+'.cice_model.res.nc')
 FileHandler({'copy': [[ice_rst, ice_rst_ana]]}).sync()
 
 # write the two seaice analysis to model change of variable yamls
-varchgyamls = ['soca_2cice_arctic.yaml', 'soca_2cice_antarctic.yaml']
 soca2cice_cfg = {
     "OCN_ANA": "./Data/ocn.3dvarfgat_pseudo.an."+window_middle_iso+".nc",
     "ICE_ANA": "./Data/ice.3dvarfgat_pseudo.an."+window_middle_iso+".nc",
@@ -294,15 +330,15 @@ soca2cice_cfg = {
 }
 varchgyamls = ['soca_2cice_arctic.yaml', 'soca_2cice_antarctic.yaml']
 for varchgyaml in varchgyamls:
-    soca2cice_cfg_template = os.path.join(gdas_home, 'parm', 'soca', 'varchange', varchgyaml)
+    soca2cice_cfg_template = os.path.join(soca_parm_dir, 'varchange', varchgyaml)
     outyaml = YAMLFile(path=soca2cice_cfg_template)
     outyaml = Template.substitute_structure(outyaml, TemplateConstants.DOLLAR_PARENTHESES, soca2cice_cfg.get)
     outyaml.save(varchgyaml)
 
 # prepare yaml for soca to MOM6 IAU increment
-logger.info(f"---------------- generate soca to MOM6 IAU yaml")
+logger.info("---------------- generate soca to MOM6 IAU yaml")
 socaincr2mom6_yaml = os.path.join(anl_dir, 'socaincr2mom6.yaml')
-socaincr2mom6_yaml_template = os.path.join(gdas_home, 'parm', 'soca', 'variational', 'socaincr2mom6.yaml')
+socaincr2mom6_yaml_template = os.path.join(variational_yaml_dir, 'socaincr2mom6.yaml')
 s2mconfig = YAMLFile(path=socaincr2mom6_yaml_template)
 s2mconfig = Template.substitute_structure(s2mconfig, TemplateConstants.DOUBLE_CURLY_BRACES, envconfig.get)
 s2mconfig.save(socaincr2mom6_yaml)
@@ -314,17 +350,14 @@ bkg_utils.stage_ic(bkg_dir, anl_dir, RUN, gcyc)
 
 ################################################################################
 # prepare input.nml
-mom_input_nml_src = os.path.join(gdas_home, 'parm', 'soca', 'fms', 'input.nml')
-mom_input_nml_tmpl = os.path.join(stage_cfg['stage_dir'], 'mom_input.nml.tmpl')
+mom_input_nml_src = os.path.join(soca_parm_dir, 'fms', 'input.nml')
 mom_input_nml = os.path.join(stage_cfg['stage_dir'], 'mom_input.nml')
-FileHandler({'copy': [[mom_input_nml_src, mom_input_nml_tmpl]]}).sync()
-
-# swap date and stack size
-domain_stack_size = os.getenv('DOMAIN_STACK_SIZE')
-ymdhms = [int(s) for s in window_begin.strftime('%Y,%m,%d,%H,%M,%S').split(',')]
-with open(mom_input_nml_tmpl, 'r') as nml_file:
-    nml = f90nml.read(nml_file)
-    nml['ocean_solo_nml']['date_init'] = ymdhms
-    nml['fms_nml']['domains_stack_size'] = int(domain_stack_size)
-    ufsda.disk_utils.removefile(mom_input_nml)
-    nml.write(mom_input_nml)
+
+# swap date and stack size, read the parm namelist and write the patched one directly
+domain_stack_size = env['DOMAIN_STACK_SIZE']
+ymdhms = [window_begin.year, window_begin.month, window_begin.day,
+          window_begin.hour, window_begin.minute, window_begin.second]
+nml = f90nml.read(mom_input_nml_src)
+nml['ocean_solo_nml']['date_init'] = ymdhms
+nml['fms_nml']['domains_stack_size'] = int(domain_stack_size)
+nml.write(mom_input_nml, force=True)
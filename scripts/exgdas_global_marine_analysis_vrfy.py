@@ -174,10 +174,8 @@ varyaml = os.path.join(comout, 'yaml', 'var_original.yaml')
 # it would be better to refrence the dirs explicitly with the comout path
 # but eva doesn't allow for specifying output directories
 os.chdir(os.path.join(comout, 'vrfy'))
-if not os.path.exists('preevayamls'):
-    os.makedirs('preevayamls')
-if not os.path.exists('evayamls'):
-    os.makedirs('evayamls')
+for evayaml_dir in ['preevayamls', 'evayamls']:
+    os.makedirs(evayaml_dir, exist_ok=True)
 
 gen_eva_obs_yaml.gen_eva_obs_yaml(varyaml, marinetemplate, 'preevayamls')
 
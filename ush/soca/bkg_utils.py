@@ -2,7 +2,10 @@
 # Script name:         ush/soca/bkg_utils.py
 # Script description:  Utilities for staging SOCA background
 
+from concurrent.futures import ProcessPoolExecutor
 import dateutil.parser as dparser
+import hashlib
+import multiprocessing
 from datetime import datetime, timedelta
 from netCDF4 import Dataset
 import numpy as np
@@ -11,6 +14,10 @@ import shutil
 from wxflow import (Logger, FileHandler)
 import xarray as xr
 import yaml
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
 
 logger = Logger()
 
@@ -34,47 +41,54 @@ def agg_seaice(fname_in, fname_out):
     nj = np.shape(ds['aicen'])[1]
     ni = np.shape(ds['aicen'])[2]
 
-    # populate xarray with aggregated quantities
-    aggds = xr.merge([xr.DataArray(
-                      name=varname,
-                      data=np.reshape(np.sum(ds[soca2cice_vars[varname]].values, axis=0), (1, nj, ni)),
-                      dims=['time', 'yaxis_1', 'xaxis_1']) for varname in soca2cice_vars.keys()])
-
-    # remove fill value
-    encoding = {varname: {'_FillValue': False} for varname in soca2cice_vars.keys()}
-
-    # save datasets
-    aggds.to_netcdf(fname_out, format='NETCDF4', unlimited_dims='time', encoding=encoding)
-
-    # xarray doesn't allow variables and dim that have the same name, switch to netCDF4
-    ncf = Dataset(fname_out, 'a')
-    t = ncf.createVariable('time', 'f8', ('time'))
-    t[:] = 1.0
-    ncf.close()
+    # write the aggregated quantities and the time axis in a single pass,
+    # switch to netCDF4 since xarray doesn't allow variables and dim that have the same name
+    with Dataset(fname_out, 'w', format='NETCDF4') as ncf:
+        ncf.createDimension('time', None)
+        ncf.createDimension('yaxis_1', nj)
+        ncf.createDimension('xaxis_1', ni)
+        for varname, cicevarname in soca2cice_vars.items():
+            aggvar = np.sum(ds[cicevarname].values, axis=0)
+            # no fill value
+            v = ncf.createVariable(varname, aggvar.dtype, ('time', 'yaxis_1', 'xaxis_1'), fill_value=False)
+            v[0, :, :] = aggvar
+        t = ncf.createVariable('time', 'f8', ('time'))
+        t[:] = 1.0
+    ds.close()
 
 
 def cice_hist2fms(input_filename, output_filename):
     """
     Simple reformatting utility to allow soca/fms to read CICE's history
+    The dimensions and variables are renamed in place, the data is not rewritten.
     """
     input_filename_real = os.path.realpath(input_filename)
+    output_filename_real = os.path.realpath(output_filename)
 
-    # open the CICE history file
-    ds = xr.open_dataset(input_filename_real)
+    cice2fms_dims = {'ni': 'xaxis_1', 'nj': 'yaxis_1'}
+    cice2fms_vars = {'aice_h': 'aicen', 'hi_h': 'hicen', 'hs_h': 'hsnon'}
 
-    if 'aicen' in ds.variables and 'hicen' in ds.variables and 'hsnon' in ds.variables:
-        logger.info(f"*** Already reformatted, skipping.")
-        return
+    # probe the header read-only, only open for writing if there is something to rename
+    with Dataset(input_filename_real, 'r') as ncf:
+        reformatted = all(varname in ncf.variables for varname in cice2fms_vars.values())
+
+    # work on a copy of the CICE history file unless reformatting in place
+    if output_filename_real != input_filename_real:
+        shutil.copyfile(input_filename_real, output_filename_real)
 
-    # rename the dimensions to xaxis_1 and yaxis_1
-    ds = ds.rename({'ni': 'xaxis_1', 'nj': 'yaxis_1'})
+    if reformatted:
+        logger.info("*** Already reformatted, skipping.")
+        return
 
-    # rename the variables
-    ds = ds.rename({'aice_h': 'aicen', 'hi_h': 'hicen', 'hs_h': 'hsnon'})
+    # open the CICE history file once and rename everything in a single pass
+    with Dataset(output_filename_real, 'r+') as ncf:
+        # rename the dimensions to xaxis_1 and yaxis_1
+        for dim_in, dim_out in cice2fms_dims.items():
+            ncf.renameDimension(dim_in, dim_out)
 
-    # Save the new netCDF file
-    output_filename_real = os.path.realpath(output_filename)
-    ds.to_netcdf(output_filename_real, mode='w')
+        # rename the variables
+        for var_in, var_out in cice2fms_vars.items():
+            ncf.renameVariable(var_in, var_out)
 
 
 def test_hist_date(histfile, ref_date):
@@ -86,10 +100,44 @@ def test_hist_date(histfile, ref_date):
     ncf = Dataset(histfile, 'r')
     hist_date = dparser.parse(ncf.variables['time'].units, fuzzy=True) + timedelta(hours=int(ncf.variables['time'][0]))
     ncf.close()
-    logger.info(f"*** history file date: {hist_date} expected date: {ref_date}")
+    logger.info("*** history file date: %s expected date: %s", hist_date, ref_date)
     assert hist_date == ref_date, 'Inconsistent bkg date'
 
 
+def prep_bkg(bkg, bkg_date, bkg_path, out_path, ice_rst=False):
+    """
+    Check the date of an ocean background and prepare the matching seaice background
+    """
+
+    # assert validity of the ocean bkg date, remove basename
+    test_hist_date(bkg, bkg_date)
+    ocn_filename = os.path.splitext(os.path.basename(bkg))[0]+'.nc'
+
+    # prepare the seaice background, aggregate if the backgrounds are CICE restarts
+    ice_filename = ocn_filename.replace("ocean", "ice")
+    agg_ice_filename = ocn_filename.replace("ocean", "agg_ice")
+    if ice_rst:
+        # if this is a CICE restart, aggregate seaice variables and dump
+        # aggregated ice bkg in out_path
+        # TODO: This option is turned off for now, figure out what to do with it.
+        agg_seaice(os.path.join(bkg_path, ice_filename),
+                   os.path.join(out_path, agg_ice_filename))
+    else:
+        # Process the CICE history file so they can be read by soca/fms
+        # TODO: Add date check of the cice history
+        # TODO: bkg_path should be 1 level up
+        cice_hist2fms(os.path.join(os.getenv('COM_ICE_HISTORY_PREV'), ice_filename),
+                      os.path.join(out_path, agg_ice_filename))
+
+
+def bkg_list_key(files, *args):
+    """
+    Hash of the names and modification times of files, and of the other arguments
+    """
+    stamps = sorted((fname, os.stat(fname).st_mtime) for fname in files)
+    return hashlib.sha1(repr((stamps, args)).encode()).hexdigest()
+
+
 def gen_bkg_list(bkg_path, out_path, window_begin=' ', yaml_name='bkg.yaml', ice_rst=False):
     """
     Generate a YAML of the list of backgrounds for the pseudo model
@@ -98,7 +146,6 @@ def gen_bkg_list(bkg_path, out_path, window_begin=' ', yaml_name='bkg.yaml', ice
     # Pseudo model parameters (time step, start date)
     # TODO: make this a parameter
     dt_pseudo = 3
-    bkg_date = window_begin
 
     # Construct list of background file names
     GDUMP = os.getenv('GDUMP')
@@ -109,55 +156,66 @@ def gen_bkg_list(bkg_path, out_path, window_begin=' ', yaml_name='bkg.yaml', ice
     for fcst_hr in fcst_hrs:
         files.append(os.path.join(bkg_path, f'{GDUMP}.ocean.t'+gcyc+'z.inst.f'+str(fcst_hr).zfill(3)+'.nc'))
 
-    # Identify the ocean background that will be used for the  vertical coordinate remapping
-    ocn_filename_ic = os.path.splitext(os.path.basename(files[0]))[0]+'.nc'
-    test_hist_date(os.path.join(bkg_path, ocn_filename_ic), bkg_date)  # assert date of the history file is correct
-
-    # Copy/process backgrounds and generate background yaml list
-    bkg_list_src_dst = []
-    bkg_list = []
-    for bkg in files:
-
-        # assert validity of the ocean bkg date, remove basename
-        test_hist_date(bkg, bkg_date)
-        ocn_filename = os.path.splitext(os.path.basename(bkg))[0]+'.nc'
-
-        # prepare the seaice background, aggregate if the backgrounds are CICE restarts
-        ice_filename = ocn_filename.replace("ocean", "ice")
-        agg_ice_filename = ocn_filename.replace("ocean", "agg_ice")
-        if ice_rst:
-            # if this is a CICE restart, aggregate seaice variables and dump
-            # aggregated ice bkg in out_path
-            # TODO: This option is turned off for now, figure out what to do with it.
-            agg_seaice(os.path.join(bkg_path, ice_filename),
-                       os.path.join(out_path, agg_ice_filename))
-        else:
-            # Process the CICE history file so they can be read by soca/fms
-            # TODO: Add date check of the cice history
-            # TODO: bkg_path should be 1 level up
-            cice_hist2fms(os.path.join(os.getenv('COM_ICE_HISTORY_PREV'), ice_filename),
-                          os.path.join(out_path, agg_ice_filename))
-
-        # prepare list of ocean bkg to be copied to RUNDIR
-        bkg_list_src_dst.append([os.path.join(bkg_path, ocn_filename),
-                                 os.path.join(out_path, ocn_filename)])
-
-        bkg_dict = {'date': bkg_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                    'basename': './bkg/',
-                    'ocn_filename': ocn_filename,
-                    'ice_filename': agg_ice_filename,
-                    'read_from_file': 1}
-
-        bkg_date = bkg_date + timedelta(hours=dt_pseudo)  # TODO: make the bkg interval a configurable
-        bkg_list.append(bkg_dict)
+    # Background dates, one every dt_pseudo hours from the beginning of the window
+    # TODO: make the bkg interval a configurable
+    bkg_dates = [window_begin + timedelta(hours=dt_pseudo*i) for i in range(len(files))]
+
+    # remove basename, prepare list of ocean bkg to be copied to RUNDIR and background yaml list
+    ocn_filenames = [os.path.splitext(os.path.basename(bkg))[0]+'.nc' for bkg in files]
+    bkg_list_src_dst = [[os.path.join(bkg_path, ocn_filename), os.path.join(out_path, ocn_filename)]
+                        for ocn_filename in ocn_filenames]
+    bkg_list = [{'date': bkg_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                 'basename': './bkg/',
+                 'ocn_filename': ocn_filename,
+                 'ice_filename': ocn_filename.replace("ocean", "agg_ice"),
+                 'read_from_file': 1} for bkg_date, ocn_filename in zip(bkg_dates, ocn_filenames)]
+
+    # quick path, skip everything if the backgrounds did not change since the last call
+    ice_dir = bkg_path if ice_rst else os.getenv('COM_ICE_HISTORY_PREV')
+    input_files = files + [os.path.join(ice_dir, ocn_filename.replace("ocean", "ice")) for ocn_filename in ocn_filenames]
+    output_files = [dst for _, dst in bkg_list_src_dst] + [os.path.join(out_path, bkg['ice_filename']) for bkg in bkg_list]
+    key_args = (window_begin, out_path, ice_rst)
+    key_name = yaml_name+'.key'
+    if all(os.path.exists(fname) for fname in [yaml_name, key_name] + input_files + output_files):
+        with open(key_name, 'r') as f:
+            if f.read() == bkg_list_key(input_files, *key_args):
+                logger.info("*** %s is up to date, skipping.", yaml_name)
+                return
+
+    # invalidate the key before touching the outputs, it is written back once everything is done
+    # so that a run dying halfway does not leave partially written backgrounds behind a valid key
+    if os.path.exists(key_name):
+        os.remove(key_name)
+
+    # check and process the backgrounds concurrently, the files are independent
+    # processes rather than threads since the HDF5 library is not thread safe
+    # fork explicitly, the calling scripts run at module level and would be
+    # re-executed by every worker under the spawn/forkserver start methods
+    nproc = min(int(os.getenv('BKG_NPROC', 8)), len(files))
+    with ProcessPoolExecutor(max_workers=nproc, mp_context=multiprocessing.get_context('fork')) as executor:
+        futures = {executor.submit(prep_bkg, bkg, date, bkg_path, out_path, ice_rst): bkg
+                   for bkg, date in zip(files, bkg_dates)}
+    failed = []
+    for future, bkg in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            logger.error("*** Failed to process %s: %s", bkg, e)
+            failed.append(bkg)
+    if failed:
+        raise RuntimeError(f"Failed to process {len(failed)} background(s): {failed}")
 
     # save pseudo model yaml configuration
-    f = open(yaml_name, 'w')
-    yaml.dump(bkg_list[1:], f, sort_keys=False, default_flow_style=False)
+    with open(yaml_name, 'w') as f:
+        yaml.dump(bkg_list[1:], f, Dumper=SafeDumper, sort_keys=False, default_flow_style=False)
 
     # copy ocean backgrounds to RUNDIR
     FileHandler({'copy': bkg_list_src_dst}).sync()
 
+    # record the state of the inputs for the quick path
+    with open(key_name, 'w') as f:
+        f.write(bkg_list_key(input_files, *key_args))
+
 
 def stage_ic(bkg_dir, anl_dir, RUN, gcyc):
 
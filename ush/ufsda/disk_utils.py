@@ -12,9 +12,9 @@ def mkdir(dirpath):
     import os
     try:
         os.makedirs(dirpath, exist_ok=True)
-        logging.info(f"{dirpath} created successfully")
+        logging.info("%s created successfully", dirpath)
     except OSError as error:
-        logging.info(f"{dirpath} could not be created")
+        logging.info("%s could not be created", dirpath)
 
 
 def removefile(file):
@@ -22,9 +22,9 @@ def removefile(file):
     # which does not exixt in the version installed on orion
     if os.path.exists(file):
         os.remove(file)
-        logging.info(f"Remove {file}")
+        logging.info("Remove %s", file)
     else:
-        logging.info(f"{file} does not exists...")
+        logging.info("%s does not exists...", file)
 
 
 def copytree(src, dest):
@@ -32,35 +32,35 @@ def copytree(src, dest):
     # which does not exixt in the version installed on orion
     try:
         shutil.copytree(src, dest)
-        logging.info(f"Recursive copy of {src} to {dest}")
+        logging.info("Recursive copy of %s to %s", src, dest)
     except FileExistsError:
         shutil.rmtree(dest)
-        logging.info(f"{dest} exists, removing...")
+        logging.info("%s exists, removing...", dest)
         shutil.copytree(src, dest)
-        logging.info(f"Recursive copy of {src} to {dest}")
+        logging.info("Recursive copy of %s to %s", src, dest)
 
 
 def copyfile(src, dest):
     # same as copytree but for a single file
     try:
         shutil.copy(src, dest)
-        logging.info(f"copy of {src} to {dest}")
+        logging.info("copy of %s to %s", src, dest)
     except FileExistsError:
         os.remove(dest)
-        logging.info(f"{dest} exists, removing...")
+        logging.info("%s exists, removing...", dest)
         shutil.copy(src, dest)
-        logging.info(f"copy of {src} to {dest}")
+        logging.info("copy of %s to %s", src, dest)
 
 
 def symlink(src, dest, remove=True):
     try:
         os.symlink(src, dest)
-        logging.info(f"Symbolically linked {src} to {dest}")
+        logging.info("Symbolically linked %s to %s", src, dest)
     except FileExistsError:
         if remove:
             os.remove(dest)
-            logging.info(f"{dest} exists, removing...")
+            logging.info("%s exists, removing...", dest)
             os.symlink(src, dest)
-            logging.info(f"Symbolically linked {src} to {dest}")
+            logging.info("Symbolically linked %s to %s", src, dest)
         else:
-            logging.info(f"{dest} exists, do nothing.")
+            logging.info("%s exists, do nothing.", dest)
@@ -2,6 +2,7 @@ import datetime
 import os
 from solo.yaml_file import YAMLFile
 from solo.template import TemplateConstants, Template
+from ufsda.yamltools import template_keys
 
 
 def gen_yaml(outyaml, templateyaml):
@@ -28,10 +29,10 @@ def parse_config(templateyaml=None, clean=True):
         an optional template output YAML
     """
     if templateyaml:
-        # open template YAML file twice
-        # once for output, once for filtering
+        # open template YAML file for output, the top level
+        # keys used for filtering are cached between calls
         print(f'Using {templateyaml} as template')
-        config_temp = YAMLFile(templateyaml)
+        config_temp = template_keys(templateyaml)
         config_out = YAMLFile(templateyaml)
     else:
         config_out = YAMLFile(data={})
@@ -1,4 +1,5 @@
 import datetime
+import functools
 import os
 import re
 import logging
@@ -39,6 +40,22 @@ def save_check(config, target, app='var'):
     wxflow.save_as_yaml(config, target)
 
 
+@functools.lru_cache(maxsize=32)
+def _template_keys(template, mtime):
+    # parse the template once per modification time
+    return frozenset(YAMLFile(template).keys())
+
+
+def template_keys(template):
+    """
+    template_keys(template)
+
+    returns the top level keys of the template YAML file, the template
+    is only parsed again if it was modified since the last call
+    """
+    return _template_keys(template, os.stat(template).st_mtime)
+
+
 def parse_config(input_config_dict, template=None, clean=True):
     """
     parse_config(input_config_dict, template=None, clean=True)
@@ -51,9 +68,9 @@ def parse_config(input_config_dict, template=None, clean=True):
     clean             - if True, and template not None, removes top level dict keys not in template
     """
     if template:
-        # open template YAML twice
-        # once for processing, once for cleaning later
-        config_temp = YAMLFile(template)
+        # open template YAML for processing, the top level keys used
+        # for cleaning later are cached between calls
+        config_temp = template_keys(template)
         config_out = YAMLFile(template)
     else:
         config_out = YAMLFile(data={})